@@ -7,19 +7,180 @@ from __future__ import annotations
 from typing import Tuple, Optional, List, Dict
 import os
 import time
-import math
+from array import array
+from math import sqrt
+
+# Pillow, pyaxidraw and numba are imported on first use (see the _load_* helpers
+# below), so importing this module is cheap and each mode only pays for what it uses.
+Image = ImageDraw = None  # Pillow: image mode
+axidraw = None            # pyaxidraw: device mode
+np = None                 # numpy (with numba): fast rasterizer
+_rasterize = None
+_numba_checked = False
+
+# Moves shorter than this on both axes (inches) are treated as zero-length
+_MIN_SEG_IN = 1e-7
+
+# Command log kind codes (image mode)
+_CMD_MOVETO = 0
+_CMD_LINETO = 1
+_CMD_COLOR = 2
+
+# Replay script boilerplate; the header is filled from the options snapshot
+_REPLAY_HEADER = """\
+# Auto-generated by DualPlotter (offline recorder)
+# Replays the captured drawing on a real AxiDraw.
+from pyaxidraw import axidraw
+
+def main():
+    ad = axidraw.AxiDraw()
+    ad.interactive()
+    # Apply recorded options
+    ad.options.pen_pos_down = %(pen_pos_down)s
+    ad.options.pen_pos_up = %(pen_pos_up)s
+    ad.options.speed_pendown = %(speed_pendown)s
+    ad.options.speed_penup = %(speed_penup)s
+    ad.options.accel = %(accel)s
+
+    if not ad.connect():
+        print("Could not connect to AxiDraw.")
+        return
+
+"""
+_REPLAY_FOOTER = """
+    ad.disconnect()
+
+if __name__ == "__main__":
+    main()
+"""
+
+# Replay script line templates (coordinates in inches, 3 decimals)
+_MOVETO = "    ad.moveto(%.3f, %.3f)\n"
+_LINETO = "    ad.lineto(%.3f, %.3f)\n"
+_MOVETO_START = "    ad.moveto(%.3f, %.3f)  # inserted to ensure valid start\n"
+_COLOR_CHANGE = (
+    "    # --- Color change requested ---\n"
+    "    ad.moveto(0.0, 0.0)\n"
+    "    input('Please change the color to %s! Press Enter to continue...')\n"
+)
+_REPLAY_CHUNK = 4096  # command lines buffered per writelines() call
+
+# Segment count from which a 1px preview is rasterized with numba instead of Pillow.
+# Importing numba and running the parallel kernel costs ~0.6 s per process (more on a
+# cold cache) against ~0.8 us per segment in Pillow, so only huge drawings gain.
+_FAST_RASTER_MIN_SEGMENTS = 750_000
+
+
+def _load_pillow():
+    global Image, ImageDraw
+    if Image is None:
+        try:
+            from PIL import Image as _Image, ImageDraw as _ImageDraw  # pip install pillow
+        except ImportError as e:
+            raise SystemExit("This wrapper needs Pillow. Install with: pip install pillow") from e
+        Image, ImageDraw = _Image, _ImageDraw
 
-TIMESTAMP_FOR_SESSION = str(round(time.time() * 1000))
 
-try:
-    from PIL import Image, ImageDraw  # pip install pillow
-except ImportError as e:
-    raise SystemExit("This wrapper needs Pillow. Install with: pip install pillow") from e
+def _load_axidraw():
+    global axidraw
+    if axidraw is None:
+        try:
+            from pyaxidraw import axidraw as _axidraw
+        except ImportError as e:
+            raise RuntimeError("pyaxidraw not available but use_device=True was requested.") from e
+        axidraw = _axidraw
+
+
+def _load_rasterizer() -> bool:
+    """Import numba and define the rasterizer once; False if numba is unavailable."""
+    global np, _rasterize, _numba_checked
+    if _numba_checked:
+        return _rasterize is not None
+    _numba_checked = True
+    try:
+        from numba import njit, prange
+        import numpy
+    except ImportError:
+        return False  # Optional: fast rasterizer for line_px == 1 in image mode
+
+    @njit(cache=True, parallel=True)
+    def _rasterize_kernel(canvas, x0s, y0s, x1s, y1s, r, g, b):
+        """Draw same-coloured segments into an (H, W, 3) canvas with integer Bresenham.
+
+        Segments are split across threads; overlapping writes all store the same
+        colour, so no ordering or atomics are needed within one call.
+        """
+        h, w = canvas.shape[0], canvas.shape[1]
+        for i in prange(x0s.size):
+            x0, y0, x1, y1 = x0s[i], y0s[i], x1s[i], y1s[i]
+            dx = abs(x1 - x0)
+            dy = -abs(y1 - y0)
+            sx = 1 if x0 < x1 else -1
+            sy = 1 if y0 < y1 else -1
+            err = dx + dy
+            while True:
+                if 0 <= x0 < w and 0 <= y0 < h:
+                    canvas[y0, x0, 0] = r
+                    canvas[y0, x0, 1] = g
+                    canvas[y0, x0, 2] = b
+                if x0 == x1 and y0 == y1:
+                    break
+                e2 = 2 * err
+                if e2 >= dy:
+                    err += dy
+                    x0 += sx
+                if e2 <= dx:
+                    err += dx
+                    y0 += sy
+
+    np = numpy
+    _rasterize = _rasterize_kernel
+    return True
+
+
+def _drop_collinear(pts: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """
+    Drop interior pixel points that sit on a straight run between their neighbours
+    (zero cross product, same direction). Endpoints and reversals are kept.
+    """
+    out = [pts[0]]
+    ax, ay = pts[0]
+    bx, by = pts[1]
+    for i in range(2, len(pts)):
+        cx, cy = pts[i]
+        ux, uy = bx - ax, by - ay
+        vx, vy = cx - bx, cy - by
+        if ux * vy - uy * vx == 0 and ux * vx + uy * vy > 0:
+            bx, by = cx, cy  # b is redundant: extend the run a -> c
+        else:
+            out.append((bx, by))
+            ax, ay, bx, by = bx, by, cx, cy
+    out.append((bx, by))
+    return out
 
-try:
-    from pyaxidraw import axidraw
-except ImportError:
-    axidraw = None  # Only needed when use_device=True
+
+def _clip_segment(x0: int, y0: int, x1: int, y1: int, lo: int, xmax: int, ymax: int):
+    """
+    Clip a pixel segment to [lo, xmax] x [lo, ymax] (Liang-Barsky).
+    Returns the rounded (x0, y0, x1, y1) of the visible part, or None if none of it is.
+    """
+    dx, dy = x1 - x0, y1 - y0
+    t0, t1 = 0.0, 1.0
+    for p, q in ((-dx, x0 - lo), (dx, xmax - x0), (-dy, y0 - lo), (dy, ymax - y0)):
+        if p == 0:
+            if q < 0:
+                return None  # parallel to this edge and outside it
+            continue
+        t = q / p
+        if p < 0:
+            if t > t1:
+                return None
+            t0 = max(t0, t)
+        else:
+            if t < t0:
+                return None
+            t1 = min(t1, t)
+    return (round(x0 + t0 * dx), round(y0 + t0 * dy), round(x0 + t1 * dx), round(y0 + t1 * dy))
 
 
 class _Options:
@@ -75,18 +236,25 @@ class DualPlotter:
         self,
         use_device: bool,
         *,
-        out_path: str = "zout/z" + TIMESTAMP_FOR_SESSION + ".png",
+        out_path: Optional[str] = None,
         dpi: int = 100,
         page_bbox_inches: Tuple[float, float, float, float] = (0.0, 0.0, 11.69, 8.27),
         line_px: int = 1,
+        auto_open: bool = False,
     ):
         """
+        out_path: PNG path for image mode; defaults to zout/z<ms timestamp>.png.
         page_bbox_inches: (xmin, ymin, xmax, ymax) in inches for the PNG canvas.
+        auto_open: open the saved PNG with the system viewer on disconnect (macOS `open`).
         """
+        # Millisecond timestamp naming this session's output files
+        self._session_ts = time.time_ns() // 1_000_000
+
         self.use_device = use_device
-        self.out_path = out_path
+        self.out_path = out_path if out_path is not None else f"zout/z{self._session_ts}.png"
         self.dpi = int(dpi)
         self.line_px = int(line_px)
+        self._auto_open = bool(auto_open)
         self._pos: Optional[Tuple[float, float]] = None  # current (x, y) in inches
 
         # Distance tracking (in inches)
@@ -100,6 +268,12 @@ class DualPlotter:
         self.W = max(1, int(round(w_in * self.dpi)))
         self.H = max(1, int(round(h_in * self.dpi)))
 
+        # Inches -> pixels constants, cached so each conversion is one sub + one mul + round:
+        # px = (x - x_org) * dpi, py = (y - y_org) * dpi
+        self._dpi_f = float(self.dpi)
+        self._x_org = float(self.xmin)
+        self._y_org = float(self.ymin)
+
         # Options
         self.options = _Options()
 
@@ -108,21 +282,47 @@ class DualPlotter:
         self._stroke_rgb: Tuple[int, int, int] = self._COLOR_TABLE[self.BLACK]  # ### NEW
 
         if self.use_device:
-            if axidraw is None:
-                raise RuntimeError("pyaxidraw not available but use_device=True was requested.")
+            _load_axidraw()
             self._dev = axidraw.AxiDraw()
             self._apply_options()
         else:
-            # Image mode: RGB white background; draw colored lines.             # ### CHANGED (RGB)
-            self._img = Image.new("RGB", (self.W, self.H), (255, 255, 255))     # ### CHANGED
-            self._draw = ImageDraw.Draw(self._img, "RGB")                       # ### CHANGED
+            # Polylines are recorded and rasterized in bulk at disconnect: with Pillow,
+            # or with the numba kernel for very large 1px drawings (see _render_image).
+            _load_pillow()
+            self._img = None
+            self._ras_xs = array("i")      # polyline points (pixels), concatenated
+            self._ras_ys = array("i")
+            self._ras_starts = array("i")  # index of each polyline's first point
+            self._ras_rgb = bytearray()    # r, g, b per polyline
+
+            # Consecutive lineto segments are batched into one polyline (pixel coords)
+            # and drawn with a single line call when the stroke ends.
+            self._pending_polyline: List[Tuple[int, int]] = []
+            self._pending_color: Tuple[int, int, int] = self._stroke_rgb
 
             # --- Offline replay recording state ---
             self._called_interactive: bool = False
-            self._command_log: List[Tuple[str, object, object]] = []  # kind,x,y or ("color", name, None)  ### CHANGED
+            # Command log as parallel columns: kind code + x/y in inches per command.
+            # Color events store (0, 0) and their name in the sparse _color_events list.
+            self._cmd_kind = bytearray()
+            self._cmd_xs = array("d")
+            self._cmd_ys = array("d")
+            self._color_events: List[Tuple[int, str]] = []  # (command index, color name)
             self._options_snapshot: Optional[Dict[str, float]] = None
             # Separate timestamped name for the replay script
-            self._py_out_path: str = f"zout/z{TIMESTAMP_FOR_SESSION}.py"
+            self._py_out_path: str = f"zout/z{self._session_ts}.py"
+
+        # Bind the mode-specific drawing calls once (see moveto/lineto below)
+        if self.use_device:
+            self.moveto = self._moveto_device
+            self.lineto = self._lineto_device
+            self.confirmColorChange = self._confirm_color_device
+            self.draw_polyline = self._draw_polyline_device
+        else:
+            self.moveto = self._moveto_image
+            self.lineto = self._lineto_image
+            self.confirmColorChange = self._confirm_color_image
+            self.draw_polyline = self._draw_polyline_image
 
     # --- Helpers -------------------------------------------------------------
 
@@ -144,23 +344,97 @@ class DualPlotter:
         )
 
     def _to_px(self, x_in: float, y_in: float) -> Tuple[int, int]:
-        """Convert inches to image pixel coords. Y is flipped so +Y is 'up' like AxiDraw."""
-        px = int(round((x_in - self.xmin) * self.dpi))
-        py = int(round((self.ymax - y_in) * self.dpi))
-        return px, py
-
-    @staticmethod
-    def _segment_len(a: Tuple[float, float], b: Tuple[float, float]) -> float:
-        """Euclidean distance in inches between two (x, y) points."""
-        return math.hypot(b[0] - a[0], b[1] - a[1])
-
-    # ### NEW: normalize a color name and fetch RGB (image mode only)
-    def _rgb_for_name(self, color_like: str) -> Tuple[int, int, int]:
-        """Map a user string to an RGB tuple; fallback to black for unknown names."""
-        if not isinstance(color_like, str):
-            return self._COLOR_TABLE[self.BLACK]
-        name = color_like.strip().upper()
-        return self._COLOR_TABLE.get(name, self._COLOR_TABLE[self.BLACK])
+        """Convert inches to image pixel coords. +Y points down the page, as on the AxiDraw."""
+        dpi = self._dpi_f
+        return round((x_in - self._x_org) * dpi), round((y_in - self._y_org) * dpi)
+
+    def _flush_polyline(self):
+        """Draw the pending polyline (if any) in one call and reset the buffer."""
+        pts = self._pending_polyline
+        if not pts:
+            return
+        if len(pts) == 1:
+            # Every segment collapsed to one pixel: draw it as a dot
+            pts.append(pts[0])
+        elif len(pts) > 2:
+            pts = _drop_collinear(pts)
+        xs_append, ys_append = self._ras_xs.append, self._ras_ys.append
+        w, h = self.W, self.H
+        if all(0 <= px < w and 0 <= py < h for px, py in pts):
+            self._ras_starts.append(len(self._ras_xs))
+            self._ras_rgb.extend(self._pending_color)
+            for px, py in pts:
+                xs_append(px)
+                ys_append(py)
+        else:
+            # Leaves the canvas: record only the part of each segment that can reach it
+            # (a half-width margin keeps wide strokes' edges), so off-canvas coordinates
+            # never reach the int32 buffers or the rasterizers
+            m = self.line_px // 2
+            for (ax, ay), (bx, by) in zip(pts, pts[1:]):
+                seg = _clip_segment(ax, ay, bx, by, -m, w - 1 + m, h - 1 + m)
+                if seg is None:
+                    continue
+                self._ras_starts.append(len(self._ras_xs))
+                self._ras_rgb.extend(self._pending_color)
+                xs_append(seg[0])
+                ys_append(seg[1])
+                xs_append(seg[2])
+                ys_append(seg[3])
+        self._pending_polyline.clear()  # reuse the same buffer for the next stroke
+
+    def _render_image(self):
+        """Build self._img from the recorded polylines.
+
+        Pillow draws them unless the drawing is 1px and large enough to pay for
+        importing numba (_FAST_RASTER_MIN_SEGMENTS), and numba is installed.
+        """
+        n_segments = len(self._ras_xs) - len(self._ras_starts)
+        if self.line_px == 1 and n_segments >= _FAST_RASTER_MIN_SEGMENTS and _load_rasterizer():
+            self._render_fast_raster()
+        else:
+            self._render_pillow()
+
+    def _render_pillow(self):
+        """Build self._img from the recorded polylines (Pillow path)."""
+        self._img = Image.new("RGB", (self.W, self.H), (255, 255, 255))
+        # Draw through Pillow's C-level core with pre-resolved inks; this is what
+        # ImageDraw.line does internally, minus its per-call Python wrapper.
+        core_draw = ImageDraw.Draw(self._img).draw
+        draw_lines = core_draw.draw_lines
+        ink_by_rgb = {rgb: core_draw.draw_ink(rgb) for rgb in self._COLOR_TABLE.values()}
+        xs, ys, rgb, width = self._ras_xs, self._ras_ys, self._ras_rgb, self.line_px
+        ends = self._ras_starts[1:]
+        ends.append(len(xs))
+        for i, (s, e) in enumerate(zip(self._ras_starts, ends)):
+            j = 3 * i
+            ink = ink_by_rgb[(rgb[j], rgb[j + 1], rgb[j + 2])]
+            draw_lines(list(zip(xs[s:e], ys[s:e])), ink, width)
+
+    def _render_fast_raster(self):
+        """Build self._img from the recorded polylines (numba path)."""
+        # White canvas the rasterizer draws into; wrapped as the PIL image at the end
+        canvas = np.full((self.H, self.W, 3), 255, dtype=np.uint8)
+        if self._ras_starts:
+            xs = np.frombuffer(self._ras_xs, dtype=np.intc)
+            ys = np.frombuffer(self._ras_ys, dtype=np.intc)
+            starts = np.frombuffer(self._ras_starts, dtype=np.intc)
+            rgb = np.frombuffer(self._ras_rgb, dtype=np.uint8).reshape(-1, 3)
+            ends = np.append(starts[1:], xs.size)
+
+            # Segment i joins points i and i+1, except across polyline boundaries
+            seg_ok = np.ones(xs.size - 1, dtype=bool)
+            seg_ok[starts[1:] - 1] = False
+
+            # Rasterize runs of consecutive same-coloured polylines in order, so
+            # later colours still paint over earlier ones.
+            change = np.flatnonzero((rgb[1:] != rgb[:-1]).any(axis=1)) + 1
+            bounds = np.concatenate(([0], change, [starts.size]))
+            for a, b in zip(bounds[:-1], bounds[1:]):
+                lo, hi = starts[a], ends[b - 1]
+                seg = np.flatnonzero(seg_ok[lo:hi - 1]) + lo
+                _rasterize(canvas, xs[seg], ys[seg], xs[seg + 1], ys[seg + 1], *rgb[a])
+        self._img = Image.fromarray(canvas)
 
     # --- Replay script writer (offline mode) ---------------------------------
 
@@ -170,64 +444,41 @@ class DualPlotter:
             self._options_snapshot = self._snapshot_current_options()
 
         opts = self._options_snapshot
-        lines: List[str] = []
-        lines.append("# Auto-generated by DualPlotter (offline recorder)")
-        lines.append("# Replays the captured drawing on a real AxiDraw.")
-        lines.append("from pyaxidraw import axidraw")
-        lines.append("")
-        lines.append("def main():")
-        lines.append("    ad = axidraw.AxiDraw()")
-        lines.append("    ad.interactive()")
-        lines.append("    # Apply recorded options")
-        lines.append(f"    ad.options.pen_pos_down = {opts['pen_pos_down']}")
-        lines.append(f"    ad.options.pen_pos_up = {opts['pen_pos_up']}")
-        lines.append(f"    ad.options.speed_pendown = {opts['speed_pendown']}")
-        lines.append(f"    ad.options.speed_penup = {opts['speed_penup']}")
-        lines.append(f"    ad.options.accel = {opts['accel']}")
-        lines.append("")
-        lines.append("    if not ad.connect():")
-        lines.append('        print(\"Could not connect to AxiDraw.\")')
-        lines.append("        return")
-        lines.append("")
-        if not self._command_log:
-            lines.append("    # (No movements were recorded.)")
-        else:
-            lines.append("    # Replay recorded moves (inches) and color changes:")
-            # Inject moveto if first command is a lineto (keep behavior consistent)
-            cmds = list(self._command_log)
-
-            if cmds and cmds[0][0] == "lineto":
-                _, x, y = cmds[0]
-                lines.append(f"    ad.moveto({round(float(x),3)!r}, {round(float(y),3)!r})  # inserted to ensure valid start")
-                cmds = cmds[1:]
-
-            for kind, a, b in cmds:
-                if kind == "moveto":
-                    x, y = float(a), float(b)
-                    lines.append(f"    ad.moveto({round(x,3)!r}, {round(y,3)!r})")
-                elif kind == "lineto":
-                    x, y = float(a), float(b)
-                    lines.append(f"    ad.lineto({round(x,3)!r}, {round(y,3)!r})")
-                elif kind == "color":
-                    color_name = str(a)
-                    lines.append("    # --- Color change requested ---")
-                    lines.append("    ad.moveto(0.0, 0.0)")
-                    # Prompt user to change pen/ink and wait for Enter
-                    safe = color_name.replace("'", "\\'")  # basic quote safety
-                    lines.append(f"    input('Please change the color to {safe}! Press Enter to continue...')")
-                else:
-                    # Unknown event kind; ignore gracefully
-                    lines.append(f"    # (Unrecognized event skipped: {kind})")
-
-        lines.append("")
-        lines.append("    ad.disconnect()")
-        lines.append("")
-        lines.append("if __name__ == \"__main__\":")
-        lines.append("    main()")
-        content = "\n".join(lines)
-
-        with open(self._py_out_path, "w", encoding="utf-8") as f:
-            f.write(content)
+        # Stream straight to disk (large buffer) instead of joining a list of lines
+        with open(self._py_out_path, "w", encoding="utf-8", buffering=1 << 20) as f:
+            w = f.write
+            w(_REPLAY_HEADER % opts)
+            kinds, xs, ys = self._cmd_kind, self._cmd_xs, self._cmd_ys
+            if not kinds:
+                w("    # (No movements were recorded.)\n")
+            else:
+                w("    # Replay recorded moves (inches) and color changes:\n")
+                # Inject moveto if first command is a lineto (keep behavior consistent)
+                start = 0
+                if kinds[0] == _CMD_LINETO:
+                    w(_MOVETO_START % (xs[0], ys[0]))
+                    start = 1
+
+                colors = iter(self._color_events)
+                chunk: List[str] = []
+                append = chunk.append
+                for i in range(start, len(kinds)):
+                    k = kinds[i]
+                    if k == _CMD_LINETO:
+                        append(_LINETO % (xs[i], ys[i]))
+                    elif k == _CMD_MOVETO:
+                        append(_MOVETO % (xs[i], ys[i]))
+                    else:
+                        # Prompt user to change pen/ink and wait for Enter
+                        _, color_name = next(colors)
+                        safe = color_name.replace("'", "\\'")  # basic quote safety
+                        append(_COLOR_CHANGE % safe)
+                    if len(chunk) >= _REPLAY_CHUNK:
+                        f.writelines(chunk)
+                        chunk.clear()
+                f.writelines(chunk)
+
+            w(_REPLAY_FOOTER)
 
         print(f"[Image mode] Wrote AxiDraw replay script: {self._py_out_path}")
 
@@ -249,82 +500,199 @@ class DualPlotter:
             self._options_snapshot = self._snapshot_current_options()
         return True  # always "connected" in image mode
 
+    # moveto / lineto / confirmColorChange are rebound per mode in __init__ so the
+    # hot calls don't branch on use_device; these class-level versions dispatch
+    # the same way for anything that reaches them through the class.
+
     def moveto(self, x: float, y: float):
+        return (self._moveto_device if self.use_device else self._moveto_image)(x, y)
+
+    def lineto(self, x: float, y: float):
+        return (self._lineto_device if self.use_device else self._lineto_image)(x, y)
+
+    def draw_polyline(self, xs, ys):
+        """
+        Pen-up move to (xs[0], ys[0]), then pen-down through the remaining points
+        (same result as moveto + lineto per point). In device mode the whole path is
+        handed to pyaxidraw's draw_path in one call when that API is available.
+        """
+        if self.use_device:
+            return self._draw_polyline_device(xs, ys)
+        return self._draw_polyline_image(xs, ys)
+
+    # ### NEW: confirmColorChange API
+    def confirmColorChange(self, new_color: str):
+        """
+        Change pen color.
+
+        - Device mode: move pen (pen-up) to (0,0), prompt the user to change ink,
+          and wait for Enter to continue.
+        - Image mode: switch the stroke color (fallback to black for unknown names)
+          and record a color-change event so the replay script will pause similarly.
+        """
+        if self.use_device:
+            return self._confirm_color_device(new_color)
+        return self._confirm_color_image(new_color)
+
+    # --- Device mode implementations ---
+
+    def _moveto_device(self, x: float, y: float):
         x, y = float(x), float(y)
 
         # Distance tracking for pen-up travel
         if self._pos is not None:
-            self._pen_distance_in += self._segment_len(self._pos, (x, y))
+            dx = x - self._pos[0]
+            dy = y - self._pos[1]
+            self._pen_distance_in += sqrt(dx * dx + dy * dy)
         self._pos = (x, y)
+        return self._dev.moveto(x, y)
 
-        if self.use_device:
-            return self._dev.moveto(x, y)
+    def _lineto_device(self, x: float, y: float):
+        x, y = float(x), float(y)
 
-        # Record offline command
-        self._command_log.append(("moveto", x, y))
-        # (no drawing in image mode for moveto)
+        pos = self._pos
+        if pos is not None:
+            dx = x - pos[0]
+            dy = y - pos[1]
+            seg_len = sqrt(dx * dx + dy * dy)
+            self._pen_distance_in += seg_len
+            self._drawn_length_in += seg_len
+        # (if lineto is called first, the device itself jumps to the start)
+        self._pos = (x, y)
+        return self._dev.lineto(x, y)
 
-    def lineto(self, x: float, y: float):
+    def _draw_polyline_device(self, xs, ys):
+        n = len(xs)
+        if n == 0:
+            return
+        draw_path = getattr(self._dev, "draw_path", None)
+        if n == 1 or draw_path is None:
+            # Single point, or an older pyaxidraw without draw_path
+            self._moveto_device(xs[0], ys[0])
+            for i in range(1, n):
+                self._lineto_device(xs[i], ys[i])
+            return
+
+        vertices = [[float(x), float(y)] for x, y in zip(xs, ys)]
+
+        # Distance tracking: pen-up travel to the start, then the pen-down path
+        x0, y0 = vertices[0]
+        if self._pos is not None:
+            dx = x0 - self._pos[0]
+            dy = y0 - self._pos[1]
+            self._pen_distance_in += sqrt(dx * dx + dy * dy)
+        drawn = 0.0
+        for i in range(1, n):
+            x1, y1 = vertices[i]
+            dx = x1 - x0
+            dy = y1 - y0
+            drawn += sqrt(dx * dx + dy * dy)
+            x0, y0 = x1, y1
+        self._pen_distance_in += drawn
+        self._drawn_length_in += drawn
+        self._pos = (x0, y0)
+
+        return draw_path(vertices)
+
+    def _confirm_color_device(self, new_color: str):
+        # Always move the head to (0,0) first
+        self.moveto(0.0, 0.0)
+        # Prompt & wait (use the argument verbatim)
+        try:
+            input(f"Please change the color to {new_color}! Press Enter to continue...")
+        except KeyboardInterrupt:
+            print("Color change canceled by user (KeyboardInterrupt).")
+
+    # --- Image mode implementations ---
+
+    def _moveto_image(self, x: float, y: float):
         x, y = float(x), float(y)
 
-        if self._pos is None:
-            # If lineto is called first, mirror device behavior: jump to start
-            self._pos = (x, y)
-            if self.use_device:
-                return self._dev.lineto(x, y)
-            # Offline: record as a lineto; we'll insert a moveto in the replay file.
-            self._command_log.append(("lineto", x, y))
-            return
+        # Distance tracking for pen-up travel
+        if self._pos is not None:
+            dx = x - self._pos[0]
+            dy = y - self._pos[1]
+            if -_MIN_SEG_IN < dx < _MIN_SEG_IN and -_MIN_SEG_IN < dy < _MIN_SEG_IN:
+                # Repeated moveto while the pen is already up here: nothing to record
+                if self._cmd_kind and self._cmd_kind[-1] == _CMD_MOVETO:
+                    return
+            else:
+                self._pen_distance_in += sqrt(dx * dx + dy * dy)
+        self._pos = (x, y)
 
-        seg_len = self._segment_len(self._pos, (x, y))
-        self._pen_distance_in += seg_len
-        self._drawn_length_in += seg_len
+        # Pen up: the current stroke ends here
+        self._flush_polyline()
+        # Record offline command
+        self._cmd_kind.append(_CMD_MOVETO)
+        self._cmd_xs.append(x)
+        self._cmd_ys.append(y)
+        # (no drawing in image mode for moveto)
 
-        if self.use_device:
-            result = self._dev.lineto(x, y)
-        else:
-            # Render to image (current stroke color)
-            p0 = self._to_px(*self._pos)
-            p1 = self._to_px(x, y)
-            self._draw.line([p0, p1], fill=self._stroke_rgb, width=self.line_px)  # ### CHANGED
-            # Record offline command
-            self._command_log.append(("lineto", x, y))
-            result = None
+    def _lineto_image(self, x: float, y: float):
+        x, y = float(x), float(y)
 
+        pos = self._pos
         self._pos = (x, y)
-        return result
+        # Record offline command (if this is the very first command, the replay
+        # file gets a moveto inserted before it)
+        self._cmd_kind.append(_CMD_LINETO)
+        self._cmd_xs.append(x)
+        self._cmd_ys.append(y)
+        if pos is None:
+            return
 
-    # ### NEW: confirmColorChange API
-    def confirmColorChange(self, new_color: str):
-        """
-        Change pen color.
+        dx = x - pos[0]
+        dy = y - pos[1]
+        # Zero-length segments are still recorded (on paper they are dots),
+        # but there is no length to add and no new pixel to rasterize.
+        zero_len = -_MIN_SEG_IN < dx < _MIN_SEG_IN and -_MIN_SEG_IN < dy < _MIN_SEG_IN
+        if not zero_len:
+            seg_len = sqrt(dx * dx + dy * dy)
+            self._pen_distance_in += seg_len
+            self._drawn_length_in += seg_len
+
+        # Render to image (current stroke color). moveto/color changes flush the
+        # buffer, so a non-empty buffer always ends at pos (already converted).
+        rgb = self._stroke_rgb
+        if self._pending_polyline and self._pending_color is not rgb:
+            self._flush_polyline()
+        pending = self._pending_polyline
+        if not pending:
+            self._pending_color = rgb
+            pending.append(self._to_px(*pos))
+        if not zero_len:
+            dpi = self._dpi_f
+            p1 = (round((x - self._x_org) * dpi), round((y - self._y_org) * dpi))
+            if p1 != pending[-1]:  # collapse repeats after rounding to pixels
+                pending.append(p1)
+
+    def _draw_polyline_image(self, xs, ys):
+        if len(xs) == 0:
+            return
+        self._moveto_image(xs[0], ys[0])
+        lineto = self._lineto_image
+        for i in range(1, len(xs)):
+            lineto(xs[i], ys[i])
 
-        - Device mode: move pen (pen-up) to (0,0), prompt the user to change ink,
-          and wait for Enter to continue.
-        - Image mode: switch the stroke color (fallback to black for unknown names)
-          and record a color-change event so the replay script will pause similarly.
-        """
+    def _confirm_color_image(self, new_color: str):
         # Always move the (logical) head to (0,0) first
         self.moveto(0.0, 0.0)
 
         # Cache the text we will display to the user (use the argument verbatim)
         display_name = str(new_color)
 
-        if self.use_device:
-            # Prompt & wait in device mode
-            try:
-                input(f"Please change the color to {display_name}! Press Enter to continue...")
-            except KeyboardInterrupt:
-                print("Color change canceled by user (KeyboardInterrupt).")
-            return
-
-        # Image mode: set stroke color immediately (fallback to black for unknown)
-        rgb = self._rgb_for_name(display_name)
+        # Set stroke color immediately (fallback to black for unknown).
+        # The name is normalized once here; lineto only ever reads _stroke_rgb.
+        self._flush_polyline()
+        key = new_color.strip().upper() if isinstance(new_color, str) else ""
         self._stroke_color_name = display_name
-        self._stroke_rgb = rgb
+        self._stroke_rgb = self._COLOR_TABLE.get(key, self._COLOR_TABLE[self.BLACK])
 
         # Record a color-change event so the replay script reproduces the prompt
-        self._command_log.append(("color", display_name, None))
+        self._color_events.append((len(self._cmd_kind), display_name))
+        self._cmd_kind.append(_CMD_COLOR)
+        self._cmd_xs.append(0.0)
+        self._cmd_ys.append(0.0)
 
     def outlinePage(self, do_dots=False):
         self.moveto(self.xmin, self.ymin)
@@ -345,14 +713,19 @@ class DualPlotter:
         if self.use_device:
             return self._dev.disconnect()
 
+        self._flush_polyline()
+        self._render_image()
+
         # Save PNG with proper DPI metadata
-        flipped_img = self._img.transpose(Image.Transpose.FLIP_TOP_BOTTOM)
-        flipped_img.save(self.out_path, dpi=(self.dpi, self.dpi))
-        try:
-            # macOS preview convenience; ignore errors on other OSes
-            os.system(f"open {self.out_path}")
-        except Exception:
-            pass
+        # (fast zlib level: previews favour speed over file size)
+        with open(self.out_path, "wb", buffering=1 << 20) as f:
+            self._img.save(f, format="PNG", dpi=(self.dpi, self.dpi), compress_level=1)
+        if self._auto_open:
+            try:
+                # macOS preview convenience; ignore errors on other OSes
+                os.system(f"open {self.out_path}")
+            except Exception:
+                pass
 
         # Emit replay script
         self._write_replay_script()
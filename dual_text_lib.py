@@ -2,40 +2,23 @@
 # Minimal vector "font" + helpers to draw text on an AxiDraw using pyaxidraw.
 
 from dual_plotter import DualPlotter
+import atexit
 import os
 
 
 import math
+import re
 
-class _RotatingPlotter:
-    """Proxy that rotates all moveto/lineto calls around a pivot by angle_deg."""
-    def __init__(self, base_ad, angle_deg: float, pivot_x: float, pivot_y: float):
-        self._ad = base_ad
-        self._cx = float(pivot_x)
-        self._cy = float(pivot_y)
-        theta = math.radians(angle_deg % 360.0)
-        self._cos = math.cos(theta)
-        self._sin = math.sin(theta)
-
-    def _apply(self, x: float, y: float) -> tuple[float, float]:
-        # Translate to pivot, rotate, translate back.
-        dx, dy = x - self._cx, y - self._cy
-        X = self._cos * dx - self._sin * dy + self._cx
-        Y = self._sin * dx + self._cos * dy + self._cy
-        return (X, Y)
-
-    # Only the 2 funcs your drawing code uses need transforming:
-    def moveto(self, x: float, y: float) -> None:
-        X, Y = self._apply(x, y)
-        self._ad.moveto(X, Y)
-
-    def lineto(self, x: float, y: float) -> None:
-        X, Y = self._apply(x, y)
-        self._ad.lineto(X, Y)
-
-    # Delegate everything else to the underlying plotter (connect, options, etc.)
-    def __getattr__(self, name):
-        return getattr(self._ad, name)
+def rotation_affine(angle_deg: float, pivot_x: float, pivot_y: float):
+    """
+    2x3 affine (a, b, c, d, tx, ty) rotating by angle_deg around (pivot_x, pivot_y):
+    X = a*x + c*y + tx, Y = b*x + d*y + ty.
+    """
+    theta = math.radians(angle_deg)
+    cos, sin = math.cos(theta), math.sin(theta)
+    cx, cy = float(pivot_x), float(pivot_y)
+    # Translate to pivot, rotate, translate back -- folded into one matrix.
+    return (cos, sin, -sin, cos, cx - cos * cx + sin * cy, cy - sin * cx - cos * cy)
 
 
 def draw_wrapped_text_rotated(
@@ -49,18 +32,21 @@ def draw_wrapped_text_rotated(
     """
     Wrapper: rotate all drawing by angle_deg around (pivot_x_in, pivot_y_in)
     while reusing your existing draw_wrapped_text implementation.
+    The rotation is folded into each glyph's transform, so no per-point proxy is involved.
     """
-    rotated_ad = _RotatingPlotter(ad, angle_deg, pivot_x_in, pivot_y_in)
-    return draw_wrapped_text(rotated_ad, **wrapped_kwargs)
+    affine = rotation_affine(angle_deg, pivot_x_in, pivot_y_in)
+    return draw_wrapped_text(ad, affine=affine, **wrapped_kwargs)
 
 
 
 # --- line counter helpers (replace the old increment_and_get_count + global call) ---
-def _read_int_from_file(filename: str) -> int:
-    # DELETE THIS IF TESTING FOR REAL
-    return 0
-
+# While False (the default, for testing) every run counts from 0 and nothing is written;
+# set True when plotting for real so the count carries over between runs.
+_PERSIST_LINE_COUNT = False
 
+def _read_int_from_file(filename: str) -> int:
+    if not _PERSIST_LINE_COUNT:
+        return 0
     if os.path.exists(filename):
         try:
             with open(filename, "r") as f:
@@ -71,25 +57,72 @@ def _read_int_from_file(filename: str) -> int:
             print(f"Warning: Invalid content in {filename}. Resetting count.")
     return 0
 
+# Counts are read from disk once per file and kept in memory; changed values are
+# written back by flush_line_count() (also registered to run at exit).
+_LINE_COUNTS: dict[str, int] = {}
+_DIRTY_COUNTS: set[str] = set()
+
 def read_line_count(filename: str = "run_count.txt") -> int:
     """Return the current global 'line index' (how many baseline steps are already used)."""
-    return _read_int_from_file(filename)
+    count = _LINE_COUNTS.get(filename)
+    if count is None:
+        count = _LINE_COUNTS[filename] = _read_int_from_file(filename)
+    return count
 
 def increment_line_count(increment_by: int, filename: str = "run_count.txt") -> int:
-    """Increase the stored count by `increment_by` and return the new total."""
-    current = _read_int_from_file(filename)
-    new_val = max(0, current + int(increment_by))
-    with open(filename, "w") as f:
-        f.write(str(new_val))
+    """Increase the stored count by `increment_by` and return the new total (saved on flush/exit)."""
+    new_val = max(0, read_line_count(filename) + int(increment_by))
+    _LINE_COUNTS[filename] = new_val
+    if _PERSIST_LINE_COUNT:
+        _DIRTY_COUNTS.add(filename)
     return new_val
 
+def flush_line_count() -> None:
+    """Write any counts changed since the last flush back to their files."""
+    for filename in sorted(_DIRTY_COUNTS):
+        with open(filename, "w") as f:
+            f.write(str(_LINE_COUNTS[filename]))
+    _DIRTY_COUNTS.clear()
+
+atexit.register(flush_line_count)
+
 
 # --- A TINY SINGLE-STROKE FONT (normalized 0..1) ---
 # Each glyph: {'w': advance_width_in_em, 'strokes': [ [(x,y), (x,y), ...], ... ] }
 # Coordinates assume baseline at y=0 and cap height at y=1.
 # This is intentionally simple and “boxy” to be plotter-friendly. Extend as you like.
 
-FONT = {
+class _Font(dict):
+    """
+    FONT's dict type: assigning or deleting a glyph recompiles it right away, so the
+    drawing loops never check for stale entries. Call recompile_font() after editing
+    a glyph in place (e.g. appending to its 'strokes').
+    """
+    def __setitem__(self, ch, g):
+        dict.__setitem__(self, ch, g)
+        FONT_COMPILED[ch] = _compile_glyph(ch, g)
+        _ASCII_GLYPHS[:] = _ascii_glyph_table()
+
+    def __delitem__(self, ch):
+        dict.__delitem__(self, ch)
+        del FONT_COMPILED[ch]
+        _ASCII_GLYPHS[:] = _ascii_glyph_table()
+
+    def update(self, *args, **kwargs):
+        dict.update(self, *args, **kwargs)
+        recompile_font()
+
+    def setdefault(self, ch, g=None):
+        if ch not in self:
+            self[ch] = g
+        return self[ch]
+
+    def pop(self, ch, *default):
+        g = dict.pop(self, ch, *default)
+        recompile_font()
+        return g
+
+FONT = _Font({
     'a': {'w': 1, 'strokes': [
         [(0, 1), (0.5, 0), (1,1)],
         [(0.25, 0.5), (0.75, 0.5)]
@@ -156,9 +189,6 @@ FONT = {
     'r': {'w': 0.6, 'strokes': [
         [(0,1),(0,0),(0.8,0),(1,0.2),(1,0.5),(0,0.5),(1,1)]
     ]},
-    'w': {'w': 0.8, 'strokes': [
-        [(0.05, 1.0), (0.2, 0.0), (0.4, 1.0), (0.6, 0.0), (0.75, 1.0)]
-    ]},
     's': {'w': 0.55, 'strokes': [
         [(1,0),(0.5,0),(0.25,0.5),(1,0.5),(1,1),(0,1)]
     ]},
@@ -272,36 +302,30 @@ FONT = {
     ]},
     # Space = no strokes, just an advance width
     ' ': {'w': 0.35, 'strokes': []},
-}
+})
+
+# Each key must appear once in the literal above (a repeated key silently replaces the
+# earlier entry); 'w' used to be defined twice.
+assert FONT['w']['w'] == 1
 
 def draw_polyline(ad, poly, ox, oy, sx, sy):
     """Draw one polyline (list of (x,y) in 0..1 box) scaled & translated to inches."""
     if not poly:
         return
+    polyline = getattr(ad, "draw_polyline", None)
+    if polyline is not None:
+        # Hand the whole transformed stroke to the plotter in one call
+        polyline([ox + ux * sx for ux, _ in poly], [oy + uy * sy for _, uy in poly])
+        return
     x0 = ox + poly[0][0] * sx
     y0 = oy + poly[0][1] * sy
     ad.moveto(x0, y0)           # pen up move to start
     for (ux, uy) in poly[1:]:
         ad.lineto(ox + ux * sx, oy + uy * sy)  # pen down line to next point
 
-def draw_glyph(ad, ch, x, y, height_in, tracking_in=0.0):
-    """
-    Draw a single glyph at baseline origin (x, y), with height = height_in inches.
-    Returns the advance (inches) to add to the cursor (width + tracking).
-    """
-    g = FONT.get(ch, FONT['?'])
-    width_em = 0.6 # g['w']
-    # Scale X so glyph width is proportional to height for a roughly uniform look:
-    sx = width_em * height_in
-    sy = height_in
-
-    for stroke in g['strokes']:
-        draw_polyline(ad, stroke, x, y, sx, sy)
-
-    return sx + tracking_in  # advance
-
 # --- add this near your FONT dict ---
 GLYPH_WIDTH_EM = 0.6  # keep in sync with draw_glyph; single source of truth
+_WORD_RE = re.compile(r"\S+")  # same word boundaries as str.split()
 
 def glyph_advance_inches(height_in: float, letter_spacing_em: float) -> float:
     """Advance contributed by a single non-space glyph (width + tracking), in inches."""
@@ -327,20 +351,39 @@ def measure_word_width_inches(word: str, height_in: float, letter_spacing_em: fl
     return len(word) * glyph_advance_inches(height_in, letter_spacing_em)
 
 
-# --- update draw_glyph to use GLYPH_WIDTH_EM so drawing == measuring ---
-def draw_glyph(ad, ch, x, y, height_in, tracking_in=0.0):
+# --- draw_glyph uses GLYPH_WIDTH_EM so drawing == measuring ---
+def _draw_glyph_fast(ad, g, x, y, sx, sy, affine=None):
+    """Draw compiled glyph g at (x, y) with precomputed scales sx, sy (see draw_glyph)."""
+    # Compose scale + translate (+ page affine) into one 2x3 matrix for the glyph
+    if affine is None:
+        a, b, c, d, tx, ty = sx, 0.0, 0.0, sy, x, y
+    else:
+        a, b, c, d, tx, ty = affine
+        a, b, c, d, tx, ty = a * sx, b * sx, c * sy, d * sy, a * x + c * y + tx, b * x + d * y + ty
+
+    # Transform all of the glyph's points in one pass, then cut them into strokes
+    xs, ys = g['xs'], g['ys']
+    X = [a * px + c * py + tx for px, py in zip(xs, ys)]
+    Y = [b * px + d * py + ty for px, py in zip(xs, ys)]
+
+    polyline = getattr(ad, "draw_polyline", None)
+    for start, end in g['bounds']:
+        if polyline is not None:
+            # Batched: one plotter call per stroke instead of one per vertex
+            polyline(X[start:end], Y[start:end])
+            continue
+        ad.moveto(X[start], Y[start])  # pen up move to start
+        for i in range(start + 1, end):
+            ad.lineto(X[i], Y[i])  # pen down line to next point
+
+def draw_glyph(ad, ch, x, y, height_in, tracking_in=0.0, affine=None):
     """
     Draw a single glyph at baseline origin (x, y), with height = height_in inches.
+    'affine' is an optional page transform (a, b, c, d, tx, ty), e.g. from rotation_affine.
     Returns the advance (inches) to add to the cursor (width + tracking).
     """
-    g = FONT.get(ch, FONT['?'])
-    width_em = GLYPH_WIDTH_EM  # keep consistent with measurement helpers
-    sx = width_em * height_in
-    sy = height_in
-
-    for stroke in g['strokes']:
-        draw_polyline(ad, stroke, x, y, sx, sy)
-
+    sx = GLYPH_WIDTH_EM * height_in  # keep consistent with measurement helpers
+    _draw_glyph_fast(ad, _compiled_glyph(ch), x, y, sx, height_in, affine)
     return sx + tracking_in  # advance
 
 def draw_text_line(
@@ -352,25 +395,48 @@ def draw_text_line(
     letter_spacing_em=0.12,
     word_spacing_em=None,
     font_scale: float = 1.0,
+    affine=None,
 ):
     """
     Draw a single line of text. 'font_scale' scales the drawn size (glyphs + tracking)
     but does NOT affect external layout decisions elsewhere.
+    'affine' optionally transforms the whole line (see rotation_affine).
     """
+    if not text:
+        return
+
     # Apply scale only to the drawn metrics
     h = height_in * font_scale
+    sx = GLYPH_WIDTH_EM * h
+    advance = sx + letter_spacing_em * h  # same for every glyph (width + tracking)
+
+    _draw = _draw_glyph_fast
+    _glyph = _compiled_glyph
+    table = _ASCII_GLYPHS
 
     cursor_x = origin_x_in
-    for ch in text:
-        glyph_key = ch.lower()
+    if word_spacing_em is None:
+        # Common case: spaces are ordinary (stroke-less) glyphs, so every character
+        # advances by the same step.
+        for ch in text:
+            o = ord(ch)
+            g = table[o] if o < 128 else _glyph(ch.lower())
+            if g['bounds']:
+                _draw(ad, g, cursor_x, baseline_y_in, sx, h, affine)
+            cursor_x += advance
+        return
 
+    space_advance = word_spacing_em * h
+    for ch in text:
         # Custom word spacing: advance only (scaled), no drawing
-        if glyph_key == ' ' and word_spacing_em is not None:
-            cursor_x += word_spacing_em * h
+        if ch == ' ':
+            cursor_x += space_advance
             continue
 
-        tracking = letter_spacing_em * h
-        advance = draw_glyph(ad, glyph_key, cursor_x, baseline_y_in, h, tracking_in=tracking)
+        o = ord(ch)
+        g = table[o] if o < 128 else _glyph(ch.lower())
+        if g['bounds']:
+            _draw(ad, g, cursor_x, baseline_y_in, sx, h, affine)
         cursor_x += advance
 
 
@@ -385,6 +451,7 @@ def draw_wrapped_text(
     word_spacing_em=None,
     line_spacing_in: float | None = None,
     font_scale: float = 1.0,
+    affine=None,
 ):
     """
     Draw text with word wrapping at 'max_width_in' (inches).
@@ -392,44 +459,52 @@ def draw_wrapped_text(
     - Drawing uses scaled metrics so the text appears larger/smaller, and line spacing between
       wrapped lines inside this block scales as well.
     - The starting origin (origin_x_in, baseline_y_in) is not scaled.
+    - 'affine' optionally transforms the whole block (see rotation_affine).
     """
     # --- measurement setup (UNSCALED to keep wrapping identical) ---
     if line_spacing_in is None:
         line_spacing_in = 1.5 * height_in  # base line spacing before scaling
 
-    words = text.split()
-    if not words:
-        return
+    # Per-call advances (unscaled), hoisted out of the word loop
+    glyph_adv = glyph_advance_inches(height_in, letter_spacing_em)
+    space_adv = space_advance_inches(height_in, letter_spacing_em, word_spacing_em)
+    wrap_width = max_width_in * 0.6
 
-    lines = []
-    current_words = []
+    # One pass over the words by index; each line is kept as a (start, end) span of 'text'
+    # plus whether its words are separated by single spaces (so the slice can be used as-is).
+    spans = []
+    line_start = line_end = -1
+    single_spaced = True
     current_width = 0.0
 
-    for w in words:
-        w_width = measure_word_width_inches(w, height_in, letter_spacing_em)  # unscaled
-        add_space = (len(current_words) > 0)
-        extra_space_width = (
-            space_advance_inches(height_in, letter_spacing_em, word_spacing_em) if add_space else 0.0
-        )  # unscaled
+    for m in _WORD_RE.finditer(text):
+        i, j = m.span()
+        w_width = (j - i) * glyph_adv
 
-        if current_words and (current_width + extra_space_width + w_width) > (max_width_in*0.6):
-            lines.append(" ".join(current_words))
-            current_words = [w]
+        if line_start < 0:
+            line_start, single_spaced = i, True
+            current_width = w_width
+        elif (current_width + space_adv + w_width) > wrap_width:
+            spans.append((line_start, line_end, single_spaced))
+            line_start, single_spaced = i, True
             current_width = w_width
         else:
-            if add_space:
-                current_width += extra_space_width
-            current_words.append(w)
+            if i != line_end + 1 or text[line_end] != ' ':
+                single_spaced = False
+            current_width += space_adv
             current_width += w_width
+        line_end = j
 
-    if current_words:
-        lines.append(" ".join(current_words))
+    if line_start < 0:
+        return
+    spans.append((line_start, line_end, single_spaced))
 
     # --- drawing with scale applied ---
     y = baseline_y_in
     scaled_line_spacing = line_spacing_in * font_scale
 
-    for line in lines:
+    for start, end, single_spaced in spans:
+        line = text[start:end] if single_spaced else " ".join(text[start:end].split())
         draw_text_line(
             ad,
             text=line,
@@ -439,7 +514,83 @@ def draw_wrapped_text(
             letter_spacing_em=letter_spacing_em,
             word_spacing_em=word_spacing_em,
             font_scale=font_scale,
+            affine=affine,
         )
         y += scaled_line_spacing
 
-    return len(lines)  # <-- add this
+    return len(spans)  # <-- add this
+
+
+# --- compiled font: per-stroke coordinate columns, built once at import ---
+_JOIN_EPS_EM = 1e-6  # stroke ends closer than this (em units) are treated as touching
+
+def _chain_strokes(strokes):
+    """
+    Reorder a glyph's strokes to cut pen-up travel: keep the first stroke, then repeatedly
+    take the stroke whose start (or end, drawn reversed) is nearest the current pen position.
+    A stroke that starts where the previous one ended is appended to it (no pen lift).
+    """
+    remaining = [list(poly) for poly in strokes if poly]
+    if not remaining:
+        return []
+    chains = [remaining.pop(0)]
+    eps2 = _JOIN_EPS_EM * _JOIN_EPS_EM
+    while remaining:
+        ex, ey = chains[-1][-1]
+        best = None  # (squared distance, index, reversed)
+        for i, poly in enumerate(remaining):
+            for rev, (px, py) in ((False, poly[0]), (True, poly[-1])):
+                d2 = (px - ex) ** 2 + (py - ey) ** 2
+                if best is None or d2 < best[0]:
+                    best = (d2, i, rev)
+        d2, i, rev = best
+        poly = remaining.pop(i)
+        if rev:
+            poly.reverse()
+        if d2 <= eps2:
+            chains[-1].extend(poly[1:])
+        else:
+            chains.append(poly)
+    return chains
+
+def _compile_glyph(ch, g):
+    """
+    Chain FONT[ch]'s strokes and pack all their points into flat float columns
+    'xs'/'ys' (tuples), with 'bounds' holding each stroke's (start, end) slice into them.
+    """
+    xs, ys, bounds = [], [], []
+    for poly in _chain_strokes(g['strokes']):
+        start = len(xs)
+        xs.extend(float(p[0]) for p in poly)
+        ys.extend(float(p[1]) for p in poly)
+        bounds.append((start, len(xs)))
+    return {'w': g['w'], 'xs': tuple(xs), 'ys': tuple(ys), 'bounds': tuple(bounds)}
+
+def _compile_font():
+    return {ch: _compile_glyph(ch, g) for ch, g in FONT.items()}
+
+def _compiled_glyph(ch):
+    """Compiled glyph for ch (falls back to '?')."""
+    g = FONT_COMPILED.get(ch)
+    return g if g is not None else FONT_COMPILED['?']
+
+def _ascii_glyph_table():
+    """
+    Compiled glyph per ASCII code point, case-folded the way draw_text_line looks
+    glyphs up, with '?' where FONT has no glyph (non-ASCII characters go through
+    _compiled_glyph instead).
+    """
+    fallback = FONT_COMPILED['?']
+    return [FONT_COMPILED.get(chr(o).lower(), fallback) for o in range(128)]
+
+def recompile_font():
+    """
+    Rebuild the compiled glyphs from FONT. Only needed after editing a glyph in
+    place (e.g. FONT['a']['strokes'].append(...)); assigning FONT[ch] recompiles itself.
+    """
+    FONT_COMPILED.clear()
+    FONT_COMPILED.update(_compile_font())
+    _ASCII_GLYPHS[:] = _ascii_glyph_table()
+
+FONT_COMPILED = _compile_font()
+_ASCII_GLYPHS = _ascii_glyph_table()
@@ -3,7 +3,10 @@
 
 import csv
 import os
+import subprocess
 import sys
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from dual_plotter import DualPlotter
 from dual_text_lib import draw_text_line
 
@@ -11,44 +14,84 @@ CSV_PATH = "combined_addresses.csv"
 
 
 def play_sound():
-    os.system("afplay /System/Library/Sounds/Glass.aiff &")
+    # Fire and forget; no shell in between. The chime is optional (macOS only).
+    try:
+        subprocess.Popen(
+            ["/usr/bin/afplay", "/System/Library/Sounds/Glass.aiff"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+    except OSError:
+        pass
 
 
 def load_addresses():
-    """Read all rows from the CSV. Returns (fieldnames, rows)."""
-    with open(CSV_PATH, "r") as f:
-        reader = csv.DictReader(f)
-        fieldnames = reader.fieldnames
-        rows = list(reader)
-    return fieldnames, rows
-
-
-def mark_done(name):
-    """Set Done=TRUE for a name in the CSV after the plotter finishes it."""
-    fieldnames, rows = load_addresses()
-    for row in rows:
-        if row["Name"].strip() == name.strip():
-            row["Done"] = "TRUE"
-    with open(CSV_PATH, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
+    """
+    Read all rows from the CSV. Returns (header, rows, done_flags): rows are namedtuples
+    (columns as attributes, spaces -> underscores, e.g. row.City_State) and done_flags[i]
+    says whether rows[i] is already marked Done.
+    """
+    with open(CSV_PATH, "r", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        records = [cells for cells in reader if cells]  # skip blank lines
+
+    # Cells past the header get unnamed columns, so nothing is dropped when the CSV is saved
+    n = max([len(header)] + [len(cells) for cells in records])
+    header += [""] * (n - len(header))
+    if "Done" not in header:
+        header.append("Done")
+        n += 1
+    Row = namedtuple("Row", [h.replace(" ", "_") for h in header], rename=True)
+    rows = [Row._make(cells + [""] * (n - len(cells))) for cells in records]
+    done_col = header.index("Done")
+    done_flags = [row[done_col].strip().upper() == "TRUE" for row in rows]
+    return header, rows, done_flags
+
+
+def save_addresses(header, rows, done_flags):
+    """Write all rows back to the CSV (via a temp file, so a crash never truncates it)."""
+    done_col = header.index("Done")
+    tmp_path = CSV_PATH + ".tmp"
+    with open(tmp_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for row, done in zip(rows, done_flags):
+            if done:
+                row = row[:done_col] + ("TRUE",) + row[done_col + 1:]
+            writer.writerow(row)
+    os.replace(tmp_path, CSV_PATH)
+
+
+def mark_done(executor, index, header, rows, done_flags):
+    """
+    Mark rows[index] Done after the plotter finishes it and save the CSV on the
+    executor's thread. Returns the future; call .result() on it before the next
+    save, which also re-raises any error from the save.
+    """
+    done_flags[index] = True
+    return executor.submit(save_addresses, header, rows, done_flags)
+
+
+def _clean_field(row, key):
+    """Field value with surrounding whitespace stripped and internal runs collapsed to one space."""
+    return " ".join(getattr(row, key, "").split())
 
 
 def build_address_lines(row):
     """Build list of text lines from a CSV row."""
     lines = []
-    name = row.get("Name", "").strip()
+    name = _clean_field(row, "Name")
     if name:
         lines.append(name)
-    address = row.get("Address", "").strip()
+    address = _clean_field(row, "Address")
     if address:
         lines.append(address)
-    line2 = row.get("Line2", "").strip()
+    line2 = _clean_field(row, "Line2")
     if line2:
         lines.append(line2)
-    city_state = row.get("City State", "").strip()
-    zipcode = row.get("Zip", "").strip()
+    city_state = _clean_field(row, "City_State")
+    zipcode = _clean_field(row, "Zip")
     if city_state and zipcode:
         lines.append(f"{city_state} {zipcode}")
     elif city_state:
@@ -62,8 +105,8 @@ def main():
     test_mode = "--test" in sys.argv
 
     # Read addresses, filter to only those not yet done
-    fieldnames, addresses = load_addresses()
-    todo = [a for a in addresses if a.get("Done", "").strip().upper() != "TRUE"]
+    header, addresses, done_flags = load_addresses()
+    todo = [i for i, done in enumerate(done_flags) if not done]  # row indices
     done_count = len(addresses) - len(todo)
 
     print(f"Loaded {len(addresses)} total addresses.")
@@ -81,14 +124,15 @@ def main():
 
     if test_mode:
         # Render a preview image of the first remaining address
-        ad = DualPlotter(use_device=False)
+        ad = DualPlotter(use_device=False, auto_open=True)
         ad.interactive()
         ad.connect()
-        lines = build_address_lines(todo[0])
+        first = addresses[todo[0]]
+        lines = build_address_lines(first)
         for j, line in enumerate(lines):
             draw_text_line(ad, line, x_offset, y_offset + j * line_spacing, height_in=line_height)
         ad.disconnect()
-        print(f"Test mode: rendered '{todo[0]['Name']}' to image.")
+        print(f"Test mode: rendered '{first.Name}' to image.")
         return
 
     # Real device mode
@@ -96,29 +140,39 @@ def main():
     ad.interactive()
     ad.connect()
 
-    for i, addr in enumerate(todo):
-        name = addr.get("Name", "?").strip()
-        lines = build_address_lines(addr)
+    _dtl = draw_text_line
+    saver = None
+    executor = ThreadPoolExecutor(max_workers=1)
+    lines = build_address_lines(addresses[todo[0]])
+    for i, row_index in enumerate(todo):
+        name = getattr(addresses[row_index], "Name", "?").strip()
 
         print(f"\n--- Envelope {i+1}/{len(todo)}: {name} ---")
         for line in lines:
             print(f"  {line}")
 
         # Draw each line on the envelope
-        for j, line in enumerate(lines):
-            draw_text_line(ad, line, x_offset, y_offset + j * line_spacing, height_in=line_height)
+        ys = [y_offset + j * line_spacing for j in range(len(lines))]
+        for y, line in zip(ys, lines):
+            _dtl(ad, line, x_offset, y, height_in=line_height)
+
+        # Mark as done in the CSV (rows stay in memory; no re-read). The save runs
+        # in the background while the pen returns home.
+        if saver is not None:
+            saver.result()
+        saver = mark_done(executor, row_index, header, addresses, done_flags)
 
         # Return pen home
         ad.moveto(0, 0)
 
-        # Mark as done in the CSV
-        mark_done(name)
-
         # Sound + wait (except after the last one)
         if i < len(todo) - 1:
+            lines = build_address_lines(addresses[todo[i + 1]])  # next envelope, ready before Enter
             play_sound()
             input(f"\nDone with {name}! Load next envelope and press Enter... ")
 
+    saver.result()
+    executor.shutdown()
     ad.disconnect()
     print("\nAll envelopes complete!")
 